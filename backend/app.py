@@ -1,9 +1,18 @@
+import asyncio
+import base64
+import bisect
+import os
+import ssl
+import statistics
 import time
-from typing import List, Dict, Any, Optional
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import List, Dict, Any, Optional, Tuple
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import requests
+import httpx
+import orjson
 import logging
 import uvicorn
 from enum import Enum
@@ -12,17 +21,31 @@ from enum import Enum
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Cria os clientes HTTP compartilhados na inicialização e os fecha no encerramento"""
+    app.state.http_client = build_http_client(verify=True)
+    app.state.http_client_insecure = build_http_client(verify=False)
+    try:
+        yield
+    finally:
+        await app.state.http_client.aclose()
+        await app.state.http_client_insecure.aclose()
+
 app = FastAPI(
     title="API Sentinel",
     description="Specialized API monitoring tool for public and private endpoints",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
+# Origens do frontend Streamlit (local e via docker-compose)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=["http://localhost:8501", "http://frontend:8501"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
+    max_age=86400,
 )
 
 # Enums para tipos de autenticação
@@ -71,31 +94,93 @@ class MonitorResponse(BaseModel):
 # Variáveis globais
 START_TIME = time.time()
 
+# Tabelas de pontuação usadas em calculate_api_score
+_AVAIL_SCORE = {200: 50, 401: 10}
+_RT_THRESH = [0.5, 1.0, 2.0]
+_RT_SCORE = [30, 20, 10, 0]
+
+# Headers da resposta incluídos no resultado de cada endpoint
+REPORTED_HEADERS = ('Content-Type', 'Server', 'X-RateLimit-Limit', 'X-RateLimit-Remaining')
+
+# Clientes HTTP assíncronos compartilhados (verify é configurado por cliente no httpx).
+# Mantêm as conexões abertas entre requisições para evitar novo handshake TCP/TLS por sondagem.
+_HTTPX_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=50,
+    keepalive_expiry=30
+)
+# Os clientes são compartilhados entre usuários, então não guardam cookies:
+# um Set-Cookie recebido numa sondagem não pode ser reenviado em outra
+# (cada sondagem usa o próprio escopo de cookies, ver fetch_endpoint).
+def _no_cookies() -> CookieJar:
+    return CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+
+# Sondagens simultâneas por requisição de monitoramento, abaixo do limite do pool
+# para que uma requisição grande não esgote as conexões compartilhadas.
+MAX_CONCURRENT_PROBES = 20
+
+def build_http_client(verify: bool) -> httpx.AsyncClient:
+    """Cria um cliente HTTP assíncrono com pool de conexões para as sondagens"""
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=10,
+        limits=_HTTPX_LIMITS,
+        cookies=_no_cookies(),
+        verify=verify
+    )
+
+async def fetch_endpoint(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Dict[str, str],
+    timeout: httpx.Timeout,
+    follow_redirects: bool
+) -> httpx.Response:
+    """Faz o GET seguindo redirecionamentos com um escopo de cookies exclusivo da sondagem"""
+    cookies = httpx.Cookies()
+    request = client.build_request("GET", url, headers=headers, timeout=timeout)
+    history = []
+    while True:
+        cookies.set_cookie_header(request)
+        response = await client.send(request, follow_redirects=False)
+        cookies.extract_cookies(response)
+        if not follow_redirects or response.next_request is None:
+            response.history = history
+            return response
+        if len(history) >= client.max_redirects:
+            raise httpx.TooManyRedirects("Exceeded maximum allowed redirects.", request=request)
+        history.append(response)
+        request = response.next_request
+
+def parse_json(response: httpx.Response) -> Any:
+    """Parseia o corpo JSON com orjson, recorrendo ao parser padrão para BOM e UTF-16/32"""
+    try:
+        return orjson.loads(response.content)
+    except orjson.JSONDecodeError:
+        return response.json()
+
+def is_ssl_error(exc: BaseException) -> bool:
+    """Verifica se a exceção (ou sua causa) é um erro de certificado SSL"""
+    while exc is not None:
+        if isinstance(exc, ssl.SSLError):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
 def calculate_api_score(status: int, response_time: float, valid_format: bool) -> int:
     """Calcula score de confiabilidade com pesos ajustados"""
-    score = 0
-    
-    # Disponibilidade (50% do score)
-    if status == 200:
-        score += 50
-    elif 200 <= status < 300:
-        score += 40
-    elif status == 401:
-        score += 10  # Pelo menos a API respondeu
-    
+    # Disponibilidade (50% do score) - 401: pelo menos a API respondeu
+    availability = _AVAIL_SCORE.get(status)
+    if availability is None:
+        availability = 40 if 200 <= status < 300 else 0
+
     # Performance (30% do score)
-    if response_time < 0.5:
-        score += 30
-    elif response_time < 1:
-        score += 20
-    elif response_time < 2:
-        score += 10
-    
+    performance = _RT_SCORE[bisect.bisect_right(_RT_THRESH, response_time)]
+
     # Consistência (20% do score)
-    if valid_format:
-        score += 20
-    
-    return min(100, score)  # Cap at 100
+    consistency = 20 if valid_format else 0
+
+    return min(100, availability + performance + consistency)  # Cap at 100
 
 def prepare_headers(auth: Optional[AuthConfig]) -> Dict[str, str]:
     """Prepara headers de autenticação"""
@@ -108,7 +193,6 @@ def prepare_headers(auth: Optional[AuthConfig]) -> Dict[str, str]:
     elif auth.auth_type == AuthType.BEARER and auth.bearer_token:
         headers["Authorization"] = f"Bearer {auth.bearer_token}"
     elif auth.auth_type == AuthType.BASIC and auth.username and auth.password:
-        import base64
         credentials = f"{auth.username}:{auth.password}"
         encoded = base64.b64encode(credentials.encode()).decode()
         headers["Authorization"] = f"Basic {encoded}"
@@ -126,7 +210,7 @@ async def health_check():
     }
 
 @app.post("/monitor/api", response_model=MonitorResponse)
-async def monitor_api(api_request: APIMonitorRequest):
+async def monitor_api(api_request: APIMonitorRequest, request: Request):
     """
     Monitora e valida endpoints de API com métricas avançadas
     
@@ -143,9 +227,12 @@ async def monitor_api(api_request: APIMonitorRequest):
     - Score geral
     - Métricas detalhadas
     - Estatísticas consolidadas
+    
+    Observação: as conexões são reutilizadas por host (keep-alive), então o
+    response_time das sondagens seguintes ao mesmo host não inclui o
+    handshake TCP/TLS.
     """
     start_time = time.time()
-    results = []
     total_score = 0
     stats = {
         'total_endpoints': len(api_request.endpoints),
@@ -153,66 +240,85 @@ async def monitor_api(api_request: APIMonitorRequest):
         'failed': 0,
         'avg_response_time': 0
     }
+    state = request.app.state
+    # Só desativa a verificação SSL quando pedido explicitamente (None mantém a validação)
+    client = state.http_client_insecure if api_request.validate_ssl is False else state.http_client
+    headers = prepare_headers(api_request.auth)
+    expected_keys = frozenset(api_request.expected_format or ())
+    # A espera por uma conexão livre no pool não conta como falha da sondagem
+    timeout = httpx.Timeout(api_request.timeout, pool=None)
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_PROBES)
 
-    for endpoint in api_request.endpoints:
-        endpoint_start = time.time()
+    async def probe(endpoint: str) -> Tuple[APIValidationResult, Optional[float]]:
+        """Sonda um endpoint; retorna o resultado e o tempo bruto (None em caso de falha)"""
         warnings = []
         try:
-            headers = prepare_headers(api_request.auth)
-            
-            response = requests.request(
-                "GET",
-                endpoint,
-                headers=headers,
-                timeout=api_request.timeout,
-                allow_redirects=api_request.follow_redirects,
-                verify=api_request.validate_ssl
-            )
-            
-            response_time = time.time() - endpoint_start
+            async with semaphore:
+                t0 = time.perf_counter()
+                response = await fetch_endpoint(
+                    client,
+                    endpoint,
+                    headers,
+                    timeout,
+                    bool(api_request.follow_redirects)
+                )
+                response_time = time.perf_counter() - t0
+
             status = response.status_code
             valid_format = True
 
-            # Validação de formato se especificado
+            # Validação de formato se especificado (o corpo só é parseado quando necessário)
             if api_request.expected_format:
                 try:
-                    json_data = response.json()
-                    missing_keys = [
-                        key for key in api_request.expected_format 
-                        if key not in json_data
-                    ]
+                    json_data = parse_json(response)
+                    if isinstance(json_data, dict):
+                        missing_keys = expected_keys.difference(json_data)
+                    else:
+                        missing_keys = expected_keys
                     if missing_keys:
                         valid_format = False
-                        warnings.append(f"Missing keys: {', '.join(missing_keys)}")
+                        warnings.append(f"Missing keys: {', '.join(sorted(missing_keys))}")
                 except ValueError:
                     valid_format = False
                     warnings.append("Invalid JSON response")
 
             # Verificação de headers importantes
-            if 'X-RateLimit-Limit' in response.headers:
-                warnings.append(
-                    f"Rate limit: {response.headers['X-RateLimit-Remaining']}/{response.headers['X-RateLimit-Limit']}"
-                )
+            hdrs = response.headers
+            rl_limit = hdrs.get('X-RateLimit-Limit')
+            if rl_limit is not None:
+                rl_remaining = hdrs.get('X-RateLimit-Remaining', '?')
+                warnings.append(f"Rate limit: {rl_remaining}/{rl_limit}")
 
             score = calculate_api_score(status, response_time, valid_format)
-            total_score += score
-            stats['successful'] += 1
-            stats['avg_response_time'] += response_time
 
-            results.append(APIValidationResult(
+            return APIValidationResult(
                 endpoint=endpoint,
                 status=status,
                 response_time=round(response_time, 4),
                 valid_format=valid_format,
-                headers=dict(response.headers),
+                headers={k: hdrs[k] for k in REPORTED_HEADERS if k in hdrs},
                 score=score,
                 warnings=warnings
-            ))
+            ), response_time
 
-        except requests.exceptions.SSLError as e:
-            error_msg = "SSL Certificate verification failed"
-            logger.warning(f"{error_msg} for {endpoint}: {str(e)}")
-            results.append(APIValidationResult(
+        except httpx.HTTPError as e:
+            if is_ssl_error(e):
+                error_msg = "SSL Certificate verification failed"
+                logger.warning(f"{error_msg} for {endpoint}: {str(e)}")
+                return APIValidationResult(
+                    endpoint=endpoint,
+                    status=0,
+                    response_time=0,
+                    valid_format=False,
+                    headers={},
+                    score=0,
+                    error=error_msg,
+                    warnings=["Try disabling SSL validation if testing internally"]
+                ), None
+
+            error_msg = str(e) or type(e).__name__
+            logger.error(f"API Monitoring failed for {endpoint}: {error_msg}")
+            return APIValidationResult(
                 endpoint=endpoint,
                 status=0,
                 response_time=0,
@@ -220,29 +326,44 @@ async def monitor_api(api_request: APIMonitorRequest):
                 headers={},
                 score=0,
                 error=error_msg,
-                warnings=["Try disabling SSL validation if testing internally"]
-            ))
-            stats['failed'] += 1
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API Monitoring failed for {endpoint}: {str(e)}")
-            results.append(APIValidationResult(
+                warnings=[]
+            ), None
+
+    outcomes = await asyncio.gather(
+        *(probe(endpoint) for endpoint in api_request.endpoints),
+        return_exceptions=True
+    )
+
+    results = []
+    response_times = []  # Tempos brutos, sem arredondamento
+    for endpoint, outcome in zip(api_request.endpoints, outcomes):
+        if isinstance(outcome, BaseException):
+            error_msg = str(outcome) or type(outcome).__name__
+            logger.error(f"API Monitoring failed for {endpoint}: {error_msg}")
+            result = APIValidationResult(
                 endpoint=endpoint,
                 status=0,
                 response_time=0,
                 valid_format=False,
                 headers={},
                 score=0,
-                error=str(e),
+                error=error_msg,
                 warnings=[]
-            ))
+            )
+            response_time = None
+        else:
+            result, response_time = outcome
+
+        if response_time is not None:
+            total_score += result.score
+            stats['successful'] += 1
+            response_times.append(response_time)
+        else:
             stats['failed'] += 1
+        results.append(result)
 
     # Calcula estatísticas finais
-    if stats['successful'] > 0:
-        stats['avg_response_time'] = round(stats['avg_response_time'] / stats['successful'], 4)
-    else:
-        stats['avg_response_time'] = 0
+    stats['avg_response_time'] = round(statistics.fmean(response_times), 4) if response_times else 0
     
     avg_score = total_score / len(api_request.endpoints) if api_request.endpoints else 0
 
@@ -255,10 +376,11 @@ async def monitor_api(api_request: APIMonitorRequest):
     )
 
 if __name__ == "__main__":
+    # Auto-reload apenas em desenvolvimento (DEV=1)
     uvicorn.run(
         "app:app", 
         host="0.0.0.0",
         port=8503,
         log_level="info",
-        reload=True
+        reload=os.getenv("DEV") == "1"
     )
\ No newline at end of file
@@ -17,13 +17,23 @@ st.set_page_config(
 # URL do backend
 BACKEND_URL = "http://backend:8503/"
 
+# Regex de URL pré-compilada para validação dos endpoints
+URL_REGEX = re.compile(r'^https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+')
+
+# Sessão HTTP por usuário, reutilizada entre reruns (mantém conexões abertas com o backend).
+# Fica em st.session_state para não compartilhar a sessão nem seus cookies entre usuários.
+def get_backend_session():
+    if 'backend_session' not in st.session_state:
+        st.session_state.backend_session = requests.Session()
+    return st.session_state.backend_session
+
 # Função para validar URLs
 def is_valid_url(url):
     try:
         result = urlparse(url)
         if not all([result.scheme, result.netloc]):
             return False
-        return re.match(r'^https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+', url)
+        return URL_REGEX.match(url)
     except:
         return False
 
@@ -61,7 +71,7 @@ def monitor_apis(endpoints, timeout, expected_keys, auth_type, auth_config):
         payload["auth"] = auth_payload
     
     try:
-        response = requests.post(
+        response = get_backend_session().post(
             f"{BACKEND_URL}/monitor/api",
             json=payload,
             timeout=timeout+5
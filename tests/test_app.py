@@ -0,0 +1,266 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import app as backend_app
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 256
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Servidor local com respostas fixas para as sondagens"""
+
+    def _send_json(self, status, body, headers=()):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_raw(self, body, content_type="application/json"):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/ok":
+            self._send_json(200, {"id": 1, "userId": 2})
+        elif self.path == "/bom":
+            self._send_raw(b"\xef\xbb\xbf" + json.dumps({"id": 1}).encode())
+        elif self.path == "/utf16":
+            self._send_raw(json.dumps({"id": 1}).encode("utf-16"))
+        elif self.path == "/invalid":
+            self._send_raw(b"not json", "text/plain")
+        elif self.path == "/ratelimit":
+            self._send_json(200, {"id": 1}, [
+                ("X-RateLimit-Limit", "100"),
+                ("X-RateLimit-Remaining", "99"),
+            ])
+        elif self.path == "/login":
+            self._send_json(200, {"id": 1}, [("Set-Cookie", "session=SECRET; Path=/")])
+        elif self.path == "/login-redirect":
+            self.send_response(302)
+            self.send_header("Set-Cookie", "session=SECRET; Path=/")
+            self.send_header("Location", "/private")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path == "/slow":
+            time.sleep(0.6)
+            self._send_json(200, {"id": 1})
+        elif self.path == "/loop":
+            self.send_response(302)
+            self.send_header("Location", "/loop")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path == "/private":
+            if "session=SECRET" in self.headers.get("Cookie", ""):
+                self._send_json(200, {"id": 1})
+            else:
+                self._send_json(401, {"detail": "unauthorized"})
+        else:
+            self._send_json(404, {"detail": "not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    server = _Server(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client():
+    with TestClient(backend_app.app) as test_client:
+        yield test_client
+
+
+@pytest.mark.parametrize("status, response_time, valid_format, expected", [
+    # Limites de tempo são estritos (< 0.5, < 1, < 2)
+    (200, 0.0, True, 100),
+    (200, 0.4999, True, 100),
+    (200, 0.5, True, 90),
+    (200, 0.9999, True, 90),
+    (200, 1.0, True, 80),
+    (200, 1.9999, True, 80),
+    (200, 2.0, True, 70),
+    (200, 30.0, False, 50),
+    # Disponibilidade: 200, outros 2xx, 401 e demais status
+    (201, 0.1, True, 90),
+    (299, 0.1, False, 70),
+    (401, 0.1, False, 40),
+    (300, 0.1, False, 30),
+    (404, 0.1, True, 50),
+    (500, 2.0, False, 0),
+    (0, 0.0, False, 30),
+])
+def test_calculate_api_score(status, response_time, valid_format, expected):
+    assert backend_app.calculate_api_score(status, response_time, valid_format) == expected
+
+
+def _unused_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _monitor(client, endpoints, **kwargs):
+    response = client.post("/monitor/api", json={"endpoints": endpoints, **kwargs})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_monitor_success(client, server_url):
+    data = _monitor(client, [f"http://{server_url}/ok"], expected_format=["id", "userId"])
+
+    result = data["results"]["endpoints"][0]
+    assert result["status"] == 200
+    assert result["valid_format"] is True
+    assert result["error"] is None
+    assert result["score"] >= 90
+    assert result["headers"]["Content-Type"] == "application/json"
+    assert data["stats"]["successful"] == 1
+    assert data["stats"]["failed"] == 0
+    assert data["stats"]["avg_response_time"] > 0
+
+
+def test_monitor_missing_keys(client, server_url):
+    data = _monitor(client, [f"http://{server_url}/ok"], expected_format=["value", "id", "body"])
+
+    result = data["results"]["endpoints"][0]
+    assert result["valid_format"] is False
+    assert result["warnings"] == ["Missing keys: body, value"]
+
+
+@pytest.mark.parametrize("path", ["/bom", "/utf16"])
+def test_monitor_json_with_bom_or_utf16(client, server_url, path):
+    data = _monitor(client, [f"http://{server_url}{path}"], expected_format=["id"])
+
+    result = data["results"]["endpoints"][0]
+    assert result["valid_format"] is True
+    assert result["warnings"] == []
+
+
+def test_monitor_invalid_json(client, server_url):
+    data = _monitor(client, [f"http://{server_url}/invalid"], expected_format=["id"])
+
+    result = data["results"]["endpoints"][0]
+    assert result["status"] == 200
+    assert result["valid_format"] is False
+    assert result["warnings"] == ["Invalid JSON response"]
+
+
+def test_monitor_rate_limit_header(client, server_url):
+    data = _monitor(client, [f"http://{server_url}/ratelimit"])
+
+    result = data["results"]["endpoints"][0]
+    assert result["warnings"] == ["Rate limit: 99/100"]
+    assert result["headers"]["X-RateLimit-Limit"] == "100"
+    assert result["headers"]["X-RateLimit-Remaining"] == "99"
+
+
+def test_monitor_connection_failure(client):
+    data = _monitor(client, [f"http://127.0.0.1:{_unused_port()}/"])
+
+    result = data["results"]["endpoints"][0]
+    assert result["status"] == 0
+    assert result["score"] == 0
+    assert result["error"]
+    assert data["stats"]["failed"] == 1
+    assert data["stats"]["avg_response_time"] == 0
+
+
+def test_monitor_invalid_url(client, server_url):
+    # httpx.InvalidURL não é um httpx.HTTPError: chega pelo return_exceptions do gather
+    data = _monitor(client, ["http://[::1", f"http://{server_url}/ok"])
+
+    invalid, ok = data["results"]["endpoints"]
+    assert invalid["endpoint"] == "http://[::1"
+    assert invalid["status"] == 0
+    assert invalid["error"]
+    assert ok["status"] == 200
+    assert data["stats"]["successful"] == 1
+    assert data["stats"]["failed"] == 1
+    # A média considera só as sondagens bem-sucedidas
+    assert abs(data["stats"]["avg_response_time"] - ok["response_time"]) <= 1e-4
+
+
+def test_monitor_ssl_failure(client, server_url):
+    data = _monitor(client, [f"https://{server_url}/ok"])
+
+    result = data["results"]["endpoints"][0]
+    assert result["error"] == "SSL Certificate verification failed"
+    assert result["warnings"] == ["Try disabling SSL validation if testing internally"]
+
+
+def test_monitor_validate_ssl_null_keeps_verification(client, monkeypatch):
+    seen = []
+
+    async def fake_send(self, request, **kwargs):
+        seen.append(self)
+        raise httpx.ConnectError("offline")
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+    _monitor(client, ["https://example.invalid/"], validate_ssl=None)
+
+    assert seen == [backend_app.app.state.http_client]
+
+
+def test_monitor_does_not_share_cookies(client, server_url):
+    _monitor(client, [f"http://{server_url}/login"])
+    data = _monitor(client, [f"http://{server_url}/private"])
+
+    assert data["results"]["endpoints"][0]["status"] == 401
+    assert len(backend_app.app.state.http_client.cookies.jar) == 0
+
+
+def test_monitor_after_restart(server_url):
+    # Cada ciclo de lifespan cria clientes novos, então um reinício não deixa clientes fechados
+    for _ in range(2):
+        with TestClient(backend_app.app) as test_client:
+            data = _monitor(test_client, [f"http://{server_url}/ok"])
+            assert data["results"]["endpoints"][0]["error"] is None
+
+
+def test_monitor_keeps_cookies_within_redirect_chain(client, server_url):
+    data = _monitor(client, [f"http://{server_url}/login-redirect"])
+
+    assert data["results"]["endpoints"][0]["status"] == 200
+
+    data = _monitor(client, [f"http://{server_url}/private"])
+    assert data["results"]["endpoints"][0]["status"] == 401
+
+
+def test_monitor_redirect_loop(client, server_url):
+    data = _monitor(client, [f"http://{server_url}/loop"])
+
+    result = data["results"]["endpoints"][0]
+    assert result["status"] == 0
+    assert result["error"] == "Exceeded maximum allowed redirects."
+
+
+def test_monitor_more_endpoints_than_pool(client, server_url):
+    count = backend_app._HTTPX_LIMITS.max_connections + 10
+    data = _monitor(client, [f"http://{server_url}/slow"] * count, timeout=1)
+
+    assert data["stats"]["successful"] == count
+    assert data["stats"]["failed"] == 0
+    assert all(r["response_time"] < 1 for r in data["results"]["endpoints"])